@@ -0,0 +1,41 @@
+import json
+import time
+import sqlite3
+import hashlib
+
+
+def cache_key(model, messages, tools=None, **params):
+    """
+    Hashes everything that determines a completion (model, messages, tool schema and any
+    other request parameters) into a stable SHA-256 key.
+    """
+    payload = {"model": model, "messages": messages, "tools": tools, **params}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Exact-match response cache persisted to a SQLite file.
+    Entries older than `ttl` seconds are treated as misses; `ttl=None` keeps them forever.
+    """
+    def __init__(self, path="llm_cache.sqlite", ttl=None):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache(key TEXT PRIMARY KEY, response TEXT, ts REAL)")
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT response, ts FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, ts = row
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            return None
+        return response
+
+    def set(self, key, response):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache(key, response, ts) VALUES (?, ?, ?)",
+            (key, response, time.time())
+        )
+        self.conn.commit()
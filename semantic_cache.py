@@ -0,0 +1,74 @@
+import os
+import json
+import numpy as np
+import faiss
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of assistant replies keyed by prompt embeddings.
+    A reply is reused when a previous prompt for the same model has cosine similarity
+    above `threshold`. The FAISS index and its entries are loaded at start-up and written
+    back next to each other by `save()`.
+    """
+    def __init__(self, index_path="semantic_cache.faiss", threshold=0.92, max_neighbors=64):
+        self.index_path = index_path
+        self.entries_path = index_path + ".json"
+        self.threshold = threshold
+        self.max_neighbors = max_neighbors
+        self.index = None
+        self.entries = []  # (prompt, model, response), parallel to the index rows
+        if os.path.exists(self.index_path) and os.path.exists(self.entries_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.entries_path, encoding="utf-8") as f:
+                self.entries = [tuple(entry) for entry in json.load(f)]
+            # A save interrupted between the two files leaves them out of step; start over
+            # rather than pairing future index rows with the wrong entries
+            if len(self.entries) != self.index.ntotal:
+                self.index = None
+                self.entries = []
+
+    @staticmethod
+    def _normalize(embedding):
+        vec = np.asarray(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def lookup(self, embedding, model):
+        """
+        Returns the cached response of the closest prompt asked of `model`, or None.
+        """
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        # Neighbours are shared across models, so look past the top hit for one from this model
+        k = min(self.index.ntotal, self.max_neighbors)
+        sims, ids = self.index.search(self._normalize(embedding), k)
+        for sim, idx in zip(sims[0], ids[0]):
+            if sim < self.threshold:
+                break
+            if idx < 0 or idx >= len(self.entries):
+                continue
+            _, cached_model, response = self.entries[idx]
+            if cached_model == model:
+                return response
+        return None
+
+    def add(self, embedding, prompt, model, response):
+        vec = self._normalize(embedding)
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(vec.shape[1])
+        self.index.add(vec)
+        self.entries.append((prompt, model, response))
+
+    def save(self):
+        """
+        Persists the index and entries. Each file is written to a temp file and swapped in
+        with os.replace, so a crash never leaves a half-written file behind.
+        """
+        if self.index is None:
+            return
+        faiss.write_index(self.index, self.index_path + ".tmp")
+        with open(self.entries_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.replace(self.entries_path + ".tmp", self.entries_path)
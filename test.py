@@ -1,7 +1,29 @@
+import os
+import csv
+import queue
+import asyncio
+import argparse
 import logging
-import time
-import pandas as pd
-from weather_fc import openai_chat
+from dataclasses import dataclass, astuple
+from logging.handlers import QueueHandler, QueueListener
+from weather_fc import (
+    openai_chat,
+    openai_chat_batch,
+    is_weather_query,
+    build_chat_request,
+    build_batch_chat_request,
+    prefill_cache_with_batch,
+    warm_up_open_meteo,
+    semantic_cache,
+)
+
+parser = argparse.ArgumentParser(description="Compare weather-assistant responses across OpenAI models.")
+parser.add_argument(
+    "--batch",
+    action="store_true",
+    help="Send first-round requests through the OpenAI Batch API (half price, may take up to 24h)"
+)
+args = parser.parse_args()
 
 models_to_test = [
     'gpt-4.1-nano-2025-04-14',
@@ -10,7 +32,7 @@ models_to_test = [
     'gpt-3.5-turbo-0125'
 ]
 
-prompts = [
+prompts = (
     ("What's the weather like in New York?", "Valid location"),
     ("Tell me the weather forecast for Tokyo.", "Valid location"),
     ("Can you check the weather in College Park?", "Valid location"),
@@ -34,56 +56,134 @@ prompts = [
     ("Weather in Chicago on Thufriday.", "Invalid time format"),
     ("Forecast in Miami on 2025-99-99.", "Invalid time format"),
     ("Show me weather in Los Angeles next next Monday.", "Invalid time format")
-]
+)
 
-# Results container
-results = []
+# Integer ids interned once; results are addressed by (prompt_id, model_id) rather than by prompt text
+prompt_ids = {prompt_text: i for i, (prompt_text, _) in enumerate(prompts)}
+model_ids = {model: i for i, model in enumerate(models_to_test)}
 
-# Logging config (only once to avoid overlap)
-logging.basicConfig(
-    filename='weather_comparison_log.txt',
-    filemode='w',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Number of prompts in flight at once; the rate limiter in weather_fc handles RPM/TPM budgets
+max_concurrent = int(os.getenv("MAX_CONCURRENT_REQUESTS", 10))
+
+csv_path = "weather_model_comparison.csv"
+csv_fields = ["Prompt", "Category", "Model", "Response"]
+
+@dataclass(slots=True)
+class Result:
+    prompt: str
+    category: str
+    model: str
+    response: str
+
+# Logging config (only once to avoid overlap). Tasks only enqueue records;
+# the listener thread does the file writes.
+log_queue = queue.Queue(-1)
+file_handler = logging.FileHandler('weather_comparison_log.txt', mode='w')
+file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, file_handler)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(log_queue))
+
+# Rows are checkpointed to the CSV as they complete so a crash mid-run keeps them;
+# the file is rewritten in sweep order once the run finishes.
+csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+csv_writer = csv.writer(csv_file, lineterminator="\n")
+csv_writer.writerow(csv_fields)
 
-for model in models_to_test:
-    for prompt_text, category in prompts:
+def truncate(text, limit=150):
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def record(row):
+    csv_writer.writerow(astuple(row))
+    csv_file.flush()  # Hand each row to the OS so a killed run still keeps it
+    return row
+
+async def run(model, prompt_text, category, semaphore):
+    async with semaphore:
         print(f"\n--- [{model}] Executing {category} ---")
         try:
-            response = openai_chat(prompt_text, model_name=model)
-            print(f"User: {prompt_text}\nAssistant: {response[:150]}...\n")
+            response = await openai_chat(prompt_text, model_name=model)
+            print(f"User: {prompt_text}\nAssistant: {truncate(response)}\n")
             logging.info(f"[{model} | {category}] {prompt_text} => {response}")
-            results.append({
-                "Prompt": prompt_text,
-                "Category": category,
-                "Model": model,
-                "Response": response
-            })
-            time.sleep(3)  # Delay to avoid rate limits
+            return record(Result(prompt_text, category, model, response))
         except Exception as e:
             error_msg = f"Error on model {model} with prompt '{prompt_text}': {str(e)}"
             print(error_msg)
             logging.error(error_msg)
-            results.append({
-                "Prompt": prompt_text,
-                "Category": category,
-                "Model": model,
-                "Response": f"ERROR: {str(e)}"
-            })
-
-df = pd.DataFrame(results)
-df.to_csv("weather_model_comparison.csv", index=False)
+            return record(Result(prompt_text, category, model, f"ERROR: {str(e)}"))
+
+async def run_batch(model, batch, semaphore):
+    async with semaphore:
+        print(f"\n--- [{model}] Executing {len(batch)} non-weather prompts in one request ---")
+        responses = await openai_chat_batch([prompt_text for prompt_text, _ in batch], model_name=model)
+    if responses is None:
+        print(f"[{model}] Batched reply could not be parsed, falling back to one request per prompt")
+        return await asyncio.gather(*(run(model, p, c, semaphore) for p, c in batch))
+
+    rows = []
+    for (prompt_text, category), response in zip(batch, responses):
+        print(f"User: {prompt_text}\nAssistant: {truncate(response)}\n")
+        logging.info(f"[{model} | {category}] {prompt_text} => {response}")
+        rows.append(record(Result(prompt_text, category, model, response)))
+    return rows
+
+async def main():
+    semaphore = asyncio.Semaphore(max_concurrent)
+    # Connect to Open-Meteo while the first OpenAI calls are in flight
+    warm_up = asyncio.create_task(warm_up_open_meteo())
+    # Weather prompts need the tool round-trip and run individually; the rest share one request per model
+    non_weather = [(p, c) for p, c in prompts if not is_weather_query(p)]
+    weather = [(model, p, c) for model in models_to_test for p, c in prompts if is_weather_query(p)]
+
+    if args.batch:
+        # Prefill the response cache; tool-call follow-ups still go out synchronously below
+        chat_requests = [build_chat_request(p, model) for model, p, _ in weather]
+        if non_weather:
+            chat_requests += [build_batch_chat_request([p for p, _ in non_weather], model) for model in models_to_test]
+        print(f"Submitting {len(chat_requests)} requests to the Batch API...")
+        cached = await prefill_cache_with_batch(chat_requests)
+        print(f"Batch complete: {cached}/{len(chat_requests)} responses cached")
+
+    singles = [run(model, p, c, semaphore) for model, p, c in weather]
+    batches = [run_batch(model, non_weather, semaphore) for model in models_to_test if non_weather]
+    single_rows, batch_rows = await asyncio.gather(asyncio.gather(*singles), asyncio.gather(*batches))
+    await warm_up
+
+    rows = list(single_rows) + [row for model_rows in batch_rows for row in model_rows]
+    # Restore the model-by-prompt order of the original sweep
+    rows.sort(key=lambda row: (model_ids[row.model], prompt_ids[row.prompt]))
+    return rows
+
+log_listener.start()
+try:
+    # Results container
+    results = asyncio.run(main())
+finally:
+    csv_file.close()
+    log_listener.stop()
+    # Batched non-weather prompts bypass the semantic cache; it only sees the per-prompt fallback
+    if semantic_cache is not None:
+        semantic_cache.save()
+
+with open(csv_path, "w", newline="", encoding="utf-8") as f:
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(csv_fields)
+    writer.writerows(astuple(r) for r in results)
+# prompt x model response matrix, filled in one pass; the README loop only indexes it
+response_matrix = [[None] * len(models_to_test) for _ in prompts]
+for r in results:
+    response_matrix[prompt_ids[r.prompt]][model_ids[r.model]] = r.response
 markdown_path = "README.md"
+parts = ["# Weather Assistant Model Comparison\n\n"]
+for pid, (prompt_text, _) in enumerate(prompts):
+    parts.append(f"## Prompt: {prompt_text}\n")
+    for mid, model in enumerate(models_to_test):
+        response = response_matrix[pid][mid]
+        if response is not None:
+            response = response.replace("\n", "  \n")
+            parts.append(f"**{model}**:\n\n```\n{response}\n```\n\n")
+    parts.append("\n---\n")
 with open(markdown_path, "w", encoding="utf-8") as md:
-    md.write("# Weather Assistant Model Comparison\n\n")
-    for prompt in prompts:
-        md.write(f"## Prompt: {prompt[0]}\n")
-        for model in models_to_test:
-            filtered = df[(df["Prompt"] == prompt[0]) & (df["Model"] == model)]
-            if not filtered.empty:
-                response = filtered["Response"].values[0].replace("\n", "  \n")
-                md.write(f"**{model}**:\n\n```\n{response}\n```\n\n")
-        md.write("\n---\n")
+    md.write("".join(parts))
 
 print("✅ Comparison complete. Results saved to `weather_model_comparison.csv` and `README.md`.")
@@ -1,20 +1,128 @@
 import os
-import requests
 import datetime
 import re
 import json
-from openai import OpenAI
-from dateparser import parse
+import time
+import asyncio
+from collections import OrderedDict
+import httpx
+import orjson
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random_exponential,
+    retry_if_exception,
+    retry_if_exception_type,
+)
+from openai.types.chat import ChatCompletion
+from llm_cache import LLMCache, cache_key
 
 MODEL = "gpt-4.1-mini-2025-04-14"
+EMBEDDING_MODEL = "text-embedding-3-small"
+MAX_RETRIES = 6
+FORECAST_CACHE_TTL = 600  # seconds an identical (location, date) forecast is reused
+GEOCODE_CACHE_SIZE = 512
+OPEN_METEO_HOSTS = ("https://geocoding-api.open-meteo.com", "https://api.open-meteo.com")
+OPEN_METEO_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Completion caps: the tool-choice call mostly returns just the tool call; replies are a few sentences
+TOOL_CALL_MAX_TOKENS = 256
+REPLY_MAX_TOKENS = 400
 
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+client = AsyncOpenAI(api_key=api_key)
 if not client.api_key:
     print("Error: The OpenAI API key is not set.")
     print("Please set the OPENAI_API_KEY environment variable or pass the api_key argument to the OpenAI client.")
 
 
+class RateLimiter:
+    """
+    Token bucket over requests and tokens per minute, in the style of the OpenAI cookbook's
+    api_request_parallel_processor. Callers wait until both budgets have capacity.
+    """
+    def __init__(self, max_requests_per_minute, max_tokens_per_minute):
+        self.max_requests = max_requests_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self.available_requests = max_requests_per_minute
+        self.available_tokens = max_tokens_per_minute
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.available_requests = min(self.max_requests, self.available_requests + elapsed * self.max_requests / 60)
+        self.available_tokens = min(self.max_tokens, self.available_tokens + elapsed * self.max_tokens / 60)
+        self.last_update = now
+
+    async def acquire(self, tokens):
+        tokens = min(tokens, self.max_tokens)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available_requests >= 1 and self.available_tokens >= tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self.available_requests) * 60 / self.max_requests,
+                    (tokens - self.available_tokens) * 60 / self.max_tokens,
+                )
+                await asyncio.sleep(wait)
+
+
+rate_limiter = RateLimiter(
+    max_requests_per_minute=float(os.getenv("MAX_REQUESTS_PER_MINUTE", 500)),
+    max_tokens_per_minute=float(os.getenv("MAX_TOKENS_PER_MINUTE", 200000)),
+)
+
+
+cache_ttl = os.getenv("LLM_CACHE_TTL")
+llm_cache = LLMCache(
+    path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite"),
+    ttl=float(cache_ttl) if cache_ttl else None,
+)
+
+# Opt-in: reusing replies across paraphrased prompts changes results, and needs faiss + numpy.
+# Only non-weather prompts are cached semantically (see openai_chat).
+semantic_cache = None
+if os.getenv("SEMANTIC_CACHE"):
+    from semantic_cache import SemanticCache
+    semantic_cache = SemanticCache(
+        index_path=os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.faiss"),
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+    )
+
+# Shared async HTTP/2 client so geocoding/forecast calls multiplex over kept-alive
+# connections to Open-Meteo. Bound to the event loop of its first request.
+# The transport retries failed connection attempts; _open_meteo_get retries the rest.
+_http = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(
+    http2=True,
+    retries=3,
+    limits=httpx.Limits(max_keepalive_connections=20),
+))
+
+# location_lc -> geocoding task, LRU-ordered. Sharing tasks lets a speculative lookup
+# and the tool call's lookup for the same location use a single request.
+_geocode_tasks = OrderedDict()
+
+# (lat, lon, date) -> (summary, fetched_at) for forecasts already retrieved this run
+_forecast_cache = {}
+
+# Capitalized place name after "in"/"for", e.g. "weather in New York?" -> "New York"
+LOCATION_HINT_RE = re.compile(r"\b(?:in|for)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)")
+
+# Fast paths for the date phrases the model actually sends; anything else goes to dateparser
+ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+NEXT_DOW_RE = re.compile(
+    r"^next\s+(mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)$"
+)
+IN_N_DAYS_RE = re.compile(r"^in\s+(\d+)\s+days?$")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
 def parse_date(text):
     """
     Parses a natural language date string into a datetime.date object.
@@ -32,12 +140,100 @@ def parse_date(text):
     if text == "this weekend":
         days_ahead = (5 - today.weekday()) % 7
         return today + datetime.timedelta(days=days_ahead)
+    if ISO_RE.match(text):
+        try:
+            return datetime.date.fromisoformat(text)
+        except ValueError:
+            return None
+    match = NEXT_DOW_RE.match(text)
+    if match:
+        target = WEEKDAYS.index(match.group(1)[:3])
+        return today + datetime.timedelta(days=(target - today.weekday()) % 7 or 7)
+    match = IN_N_DAYS_RE.match(text)
+    if match:
+        try:
+            return today + datetime.timedelta(days=int(match.group(1)))
+        except OverflowError:
+            return None
+
+    # Imported lazily: dateparser loads its locale data on import
+    from dateparser import parse
     parsed = parse(text, settings={'PREFER_DATES_FROM': 'future'})
     if parsed:
         return parsed.date()
     return None
 
-def get_weather(location, datetime_str=None):
+def _is_retryable(exc):
+    # Both Open-Meteo calls are idempotent GETs, so transport errors (e.g. a kept-alive
+    # connection dropped mid-request) are safe to retry along with throttling/5xx responses
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in OPEN_METEO_RETRY_STATUSES
+
+@retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential(multiplier=0.25, max=4),
+    retry=retry_if_exception(_is_retryable),
+    reraise=True,
+)
+async def _open_meteo_get(url, params):
+    """
+    GETs an Open-Meteo endpoint and decodes the JSON body, retrying transport errors and
+    throttled or transient server responses with exponential backoff.
+    """
+    resp = await _http.get(url, params=params)
+    resp.raise_for_status()  # Raise an exception for HTTP errors
+    return orjson.loads(resp.content)
+
+async def warm_up_open_meteo():
+    """
+    Resolves and connects to the Open-Meteo hosts ahead of the first weather query,
+    so DNS and TLS setup are off the tool-call path. Failures are ignored.
+    """
+    await asyncio.gather(*(_http.head(host) for host in OPEN_METEO_HOSTS), return_exceptions=True)
+
+async def _fetch_geocode(location_lc):
+    """
+    Resolves a lowercased location name to (latitude, longitude, resolved name), or None if
+    Open-Meteo has no match. Request and parsing errors propagate.
+    """
+    geocode_url = "https://geocoding-api.open-meteo.com/v1/search"
+    geo_params = {"name": location_lc, "count": 1, "language": "en", "format": "json"}
+
+    geo_data = await _open_meteo_get(geocode_url, geo_params)
+
+    if not geo_data.get("results"):
+        return None
+    result = geo_data["results"][0]
+    return result["latitude"], result["longitude"], result["name"]
+
+def _geocode(location_lc):
+    """
+    Returns the shared geocoding task for a location, starting one if needed. Completed lookups
+    are memoized so repeated locations skip the geocoding call; failed ones are retried next time.
+    """
+    task = _geocode_tasks.get(location_lc)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        task = asyncio.ensure_future(_fetch_geocode(location_lc))
+        # Mark failures as retrieved so an unawaited speculative lookup doesn't warn on exit
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _geocode_tasks[location_lc] = task
+        if len(_geocode_tasks) > GEOCODE_CACHE_SIZE:
+            _geocode_tasks.popitem(last=False)
+    else:
+        _geocode_tasks.move_to_end(location_lc)
+    return task
+
+def prefetch_geocode(user_message):
+    """
+    Speculatively starts geocoding a place named in the user message, so the lookup overlaps
+    the first OpenAI call and is usually resolved by the time the model requests the tool.
+    """
+    match = LOCATION_HINT_RE.search(user_message)
+    if match:
+        _geocode(match.group(1).strip().lower())
+
+async def get_weather(location, datetime_str=None):
     """
     Fetches current or forecasted weather for a given location and optional datetime
     using the Open-Meteo API. Returns a string summary or an error message.
@@ -45,29 +241,20 @@ def get_weather(location, datetime_str=None):
     if not location or not isinstance(location, str):
         return "Sorry, I couldn't determine the location for the weather query."
 
-    # Geocoding to get latitude and longitude
-    geocode_url = "https://geocoding-api.open-meteo.com/v1/search"
-    geo_params = {"name": location, "count": 1, "language": "en", "format": "json"}
-    
     try:
-        geo_resp = requests.get(geocode_url, params=geo_params)
-        geo_resp.raise_for_status()  # Raise an exception for HTTP errors
-        geo_data = geo_resp.json()
-    except requests.exceptions.RequestException as e:
+        # Shielded: other callers may be awaiting the same shared task
+        geocoded = await asyncio.shield(_geocode(location.strip().lower()))
+    except httpx.HTTPError as e:
         return f"Sorry, there was an error contacting the geocoding service: {e}"
     except json.JSONDecodeError:
         return "Sorry, the geocoding service returned an invalid response."
-
-    if not geo_data.get("results"):
-        return f"Sorry, I couldn't find location data for '{location}'."
-
-    try:
-        lat = geo_data["results"][0]["latitude"]
-        lon = geo_data["results"][0]["longitude"]
-        resolved_location = geo_data["results"][0]["name"]
     except (IndexError, KeyError):
         return f"Sorry, couldn't parse geocoding data for '{location}'."
 
+    if geocoded is None:
+        return f"Sorry, I couldn't find location data for '{location}'."
+    lat, lon, resolved_location = geocoded
+
     # Determine date for forecast
     if datetime_str:
         date_obj = parse_date(datetime_str)
@@ -78,6 +265,11 @@ def get_weather(location, datetime_str=None):
         # Default to today if no datetime_str is provided
         forecast_date_str = datetime.date.today().strftime("%Y-%m-%d")
 
+    forecast_key = (lat, lon, forecast_date_str)
+    cached = _forecast_cache.get(forecast_key)
+    if cached and time.monotonic() - cached[1] < FORECAST_CACHE_TTL:
+        return cached[0]
+
     # Fetch weather forecast for the determined date
     weather_url = "https://api.open-meteo.com/v1/forecast"
     weather_params = {
@@ -90,10 +282,8 @@ def get_weather(location, datetime_str=None):
     }
     
     try:
-        weather_resp = requests.get(weather_url, params=weather_params)
-        weather_resp.raise_for_status() # Raise an exception for HTTP errors
-        weather_data = weather_resp.json()
-    except requests.exceptions.RequestException as e:
+        weather_data = await _open_meteo_get(weather_url, weather_params)
+    except httpx.HTTPError as e:
         return f"Sorry, there was an error retrieving the weather data: {e}"
     except json.JSONDecodeError:
         return "Sorry, the weather service returned an invalid response."
@@ -114,6 +304,7 @@ def get_weather(location, datetime_str=None):
         f"- Min temperature: {temps_min}°C\n"
         f"- Precipitation: {precipitation} mm"
     )
+    _forecast_cache[forecast_key] = (summary, time.monotonic())
     return summary
 
 # --- OpenAI Function Calling Schema ---
@@ -136,81 +327,305 @@ weather_function_schema = {
     }
 }
 
-def openai_chat(user_message, model_name=MODEL):
+# Built once and shared by every request; nothing below mutates them
+_TOOLS = [{"type": "function", "function": weather_function_schema}]
+_SYSTEM_MSG = {"role": "system", "content": (
+    "You are a helpful assistant. "
+    "If the user asks about the weather, you must use the 'get_weather' function "
+    "to find the weather information. Provide the location and optionally a date string. "
+    "If the user does not ask about weather, respond normally."
+)}
+_PLAIN_SYSTEM_MSG = {"role": "system", "content": "You are a helpful assistant."}
+
+# Cheap local pre-classifier; prompts matching none of these words are answered without tools
+WEATHER_RE = re.compile(
+    r"\b(weather|forecast|rain\w*|temperature|hot|cold|sky|snow\w*|humid\w*|sunny|wind\w*|storm\w*)\b",
+    re.IGNORECASE,
+)
+
+def is_weather_query(text):
+    """
+    Returns True if the text plausibly asks about the weather and may need the get_weather tool.
+    """
+    return bool(WEATHER_RE.search(text))
+
+def _estimate_tokens(request):
+    """
+    Rough token count for rate limiting: ~4 characters per prompt token plus the completion budget.
+    """
+    prompt_chars = len(json.dumps(request.get("messages", []), default=str))
+    prompt_chars += len(json.dumps(request.get("tools", []), default=str))
+    return prompt_chars // 4 + request.get("max_completion_tokens", 256)
+
+@retry(
+    stop=stop_after_attempt(MAX_RETRIES),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+    reraise=True,
+)
+async def _create_completion(request):
+    """
+    Sends one chat completion through the shared rate limiter. Rate limit and connection
+    errors are retried with randomized exponential backoff.
+    """
+    await rate_limiter.acquire(_estimate_tokens(request))
+    # SDK retries are off here so tenacity is the only retry layer for chat completions and
+    # every HTTP attempt goes through the rate limiter; other client calls keep the SDK default
+    return await client.with_options(max_retries=0).chat.completions.create(**request)
+
+async def _chat_completion(**request):
+    """
+    Sends a chat completion with rate limiting and retries. Deterministic requests
+    (temperature unset or 0) are served from the on-disk response cache when possible.
+    """
+    cacheable = request.get("temperature") in (None, 0)
+    if cacheable:
+        key = cache_key(**request)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+
+    response = await _create_completion(request)
+
+    if cacheable:
+        llm_cache.set(key, response.model_dump_json())
+    return response
+
+async def _embed(text):
+    """
+    Embeds text for the semantic cache; embeddings are stored in the exact-match cache by SHA.
+    """
+    key = cache_key(EMBEDDING_MODEL, text)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    await rate_limiter.acquire(len(text) // 4 + 1)
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    embedding = response.data[0].embedding
+    llm_cache.set(key, json.dumps(embedding))
+    return embedding
+
+def build_chat_request(user_message, model_name=MODEL):
+    """
+    Builds the first-round tool-calling request for a user message, as keyword arguments
+    for chat.completions.create (also used as the body of Batch API requests).
+    Obvious non-weather messages get a plain request without the tool schema.
+    """
+    if not is_weather_query(user_message):
+        return {
+            "model": model_name,
+            "messages": [_PLAIN_SYSTEM_MSG, {"role": "user", "content": user_message}],
+            "prompt_cache_key": f"assistant-v1-{model_name}",
+            "max_completion_tokens": REPLY_MAX_TOKENS
+        }
+
+    return {
+        "model": model_name, # Or any other model that supports tool use
+        "messages": [_SYSTEM_MSG, {"role": "user", "content": user_message}],
+        # The static system prompt + tool schema form the shared prefix; this routes every call for
+        # the same model to the same OpenAI prompt cache. Keep dynamic content after the prefix.
+        "prompt_cache_key": f"weather-assistant-v1-{model_name}",
+        "max_completion_tokens": TOOL_CALL_MAX_TOKENS,
+        "tools": _TOOLS,
+        "tool_choice": "auto" # "auto" lets the model decide; or {"type": "function", "function": {"name": "get_weather"}}
+    }
+
+async def _tool_chat(user_message, model_name):
+    """
+    Runs the tool-calling exchange for one user message and returns the assistant's reply.
+    API errors propagate to the caller.
+    """
+    request = build_chat_request(user_message, model_name)
+    messages = request["messages"]
+    if "tools" in request:
+        prefetch_geocode(user_message)
+
+    # First API call to OpenAI
+    response = await _chat_completion(**request)
+    response_message = response.choices[0].message
+
+    tool_calls = response_message.tool_calls
+
+    if tool_calls:
+        # Plain dict so the follow-up request stays JSON-serializable for the cache key
+        messages.append(response_message.model_dump(exclude_none=True))
+        tool_call = tool_calls[0]
+        function_name = tool_call.function.name
+        
+        if function_name == "get_weather":
+            function_args_str = tool_call.function.arguments
+            try:
+                function_args = orjson.loads(function_args_str)
+            except json.JSONDecodeError:
+                function_response = "Error: Invalid arguments received for weather function."
+            else:
+                location = function_args.get("location")
+                datetime_str = function_args.get("datetime_str") # This can be None
+                function_response = await get_weather(location=location, datetime_str=datetime_str)
+            messages.append(
+                {
+                    "tool_call_id": tool_call.id,
+                    "role": "tool",
+                    "name": function_name,
+                    "content": function_response,
+                }
+            )
+
+            # Second API call to OpenAI with the function's result
+            second_response = await _chat_completion(
+                model=model_name,
+                messages=messages,
+                prompt_cache_key=request["prompt_cache_key"],
+                max_completion_tokens=REPLY_MAX_TOKENS
+            )
+            return second_response.choices[0].message.content
+        else:
+            # Fallback if a different, unexpected function is called
+            return "Assistant decided to call an unknown or unhandled function."
+    else:
+        # No tool call was made, return the assistant's direct response
+        return response_message.content
+
+async def openai_chat(user_message, model_name=MODEL):
     """
     Handles user input, determines if a weather query is made,
     calls the get_weather function via OpenAI tool use, and returns the assistant's response.
+    When the semantic cache is enabled, a reply to a near-identical earlier non-weather prompt
+    is reused. Weather prompts always run: their replies go stale and near-identical prompts
+    can name different places. Only callers of openai_chat use the semantic cache: the REPL and
+    test.py's per-prompt fallback, not openai_chat_batch. A cache failure counts as a miss.
     """
     if not client.api_key: # Check again in case it wasn't set and script continued
         return "OpenAI API key not configured. Please set the OPENAI_API_KEY environment variable."
 
+    embedding = None
+    if semantic_cache is not None and not is_weather_query(user_message):
+        try:
+            embedding = await _embed(user_message)
+            cached_reply = semantic_cache.lookup(embedding, model_name)
+            if cached_reply is not None:
+                return cached_reply
+        except Exception:
+            embedding = None
+
+    try:
+        reply = await _tool_chat(user_message, model_name)
+        if embedding is not None:
+            semantic_cache.add(embedding, user_message, model_name, reply)
+        return reply
+
+    except Exception as e: # Catch potential OpenAI API errors or other issues
+        return f"An error occurred: {e}"
+
+def build_batch_chat_request(user_messages, model_name=MODEL):
+    """
+    Builds a single request asking for answers to several independent prompts as a JSON array.
+    """
     messages = [
         {"role": "system", "content": (
-            "You are a helpful assistant. "
-            "If the user asks about the weather, you must use the 'get_weather' function "
-            "to find the weather information. Provide the location and optionally a date string. "
-            "If the user does not ask about weather, respond normally."
+            "You are a helpful assistant. The user sends a JSON array of independent prompts. "
+            "Answer each prompt on its own, as you would if it were asked alone. "
+            'Respond with a JSON object of the form {"answers": [...]} containing exactly one '
+            "answer string per prompt, in the same order."
         )},
-        {"role": "user", "content": user_message}
+        {"role": "user", "content": json.dumps(user_messages)}
     ]
+    return {
+        "model": model_name,
+        "messages": messages,
+        "response_format": {"type": "json_object"},
+        "max_completion_tokens": REPLY_MAX_TOKENS * len(user_messages)
+    }
 
-    try:
-        # First API call to OpenAI
-        response = client.chat.completions.create(
-            model=model_name, # Or any other model that supports tool use
-            messages=messages,
-            tools=[{"type": "function", "function": weather_function_schema}],
-            tool_choice="auto" # "auto" lets the model decide; or {"type": "function", "function": {"name": "get_weather"}}
-        )
-        response_message = response.choices[0].message
+async def openai_chat_batch(user_messages, model_name=MODEL):
+    """
+    Answers several independent non-weather prompts with a single completion that returns
+    a JSON array of answers. Returns the replies in prompt order, or None if the request fails
+    or the reply can't be parsed, so the caller can fall back to openai_chat per prompt.
+    """
+    if not client.api_key:
+        return None
 
-        tool_calls = response_message.tool_calls
+    try:
+        response = await _chat_completion(**build_batch_chat_request(user_messages, model_name))
+        answers = json.loads(response.choices[0].message.content)["answers"]
+    except Exception:
+        return None
 
-        if tool_calls:
-            messages.append(response_message)
-            tool_call = tool_calls[0]
-            function_name = tool_call.function.name
-            
-            if function_name == "get_weather":
-                function_args_str = tool_call.function.arguments
-                try:
-                    function_args = json.loads(function_args_str)
-                except json.JSONDecodeError:
-                    function_response = "Error: Invalid arguments received for weather function."
-                else:
-                    location = function_args.get("location")
-                    datetime_str = function_args.get("datetime_str") # This can be None
-                    function_response = get_weather(location=location, datetime_str=datetime_str)
-                messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": function_response,
-                    }
-                )
+    if not isinstance(answers, list) or len(answers) != len(user_messages):
+        return None
+    if not all(isinstance(answer, str) for answer in answers):
+        return None
+    return answers
 
-                # Second API call to OpenAI with the function's result
-                second_response = client.chat.completions.create(
-                    model=model_name,
-                    messages=messages
-                )
-                return second_response.choices[0].message.content
-            else:
-                # Fallback if a different, unexpected function is called
-                return "Assistant decided to call an unknown or unhandled function."
-        else:
-            # No tool call was made, return the assistant's direct response
-            return response_message.content
+async def _run_model_batch(model_name, by_key, poll_interval):
+    """
+    Submits one Batch API job for requests that all target `model_name`, waits for it and
+    caches the successful completions. Returns the number of completions cached; any error
+    is reported and ends this model's batch early, leaving the rest to the synchronous path.
+    """
+    lines = [
+        json.dumps({"custom_id": key, "method": "POST", "url": "/v1/chat/completions", "body": request})
+        for key, request in by_key.items()
+    ]
+    batch_id = None
+    cached = 0
+    try:
+        batch_file = await client.files.create(
+            file=(f"batch_input_{model_name}.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        batch_id = batch.id
+        # Printed right away so a paid batch can still be retrieved if this run dies while polling
+        print(f"Submitted batch {batch_id} for {model_name} ({len(lines)} requests)")
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_interval)
+            batch = await client.batches.retrieve(batch_id)
 
-    except Exception as e: # Catch potential OpenAI API errors or other issues
-        return f"An error occurred: {e}"
+        if batch.status != "completed":
+            print(f"Batch {batch_id} for {model_name} ended as '{batch.status}': {batch.errors}")
+        # Expired and cancelled batches can still carry the completions that finished in time
+        if not batch.output_file_id:
+            return 0
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result["custom_id"] in by_key and response.get("status_code") == 200:
+                llm_cache.set(result["custom_id"], json.dumps(response["body"]))
+                cached += 1
+    except Exception as e:
+        print(f"Batch {batch_id or '(not submitted)'} for {model_name} failed: {e}; "
+              "uncached requests will be sent synchronously")
+    return cached
 
+async def prefill_cache_with_batch(chat_requests, poll_interval=30):
+    """
+    Runs chat requests through the OpenAI Batch API (half price, no RPM pressure) and stores the
+    completions in the response cache, so the regular calls for the same requests become cache hits.
+    The Batch API takes one model per input file, so one batch per model is submitted and they are
+    polled concurrently. Requests that fail in a batch are simply left uncached.
+    Returns the number of completions cached.
+    """
+    by_model = {}
+    for request in chat_requests:
+        by_model.setdefault(request["model"], {})[cache_key(**request)] = request
+    counts = await asyncio.gather(*(
+        _run_model_batch(model_name, by_key, poll_interval)
+        for model_name, by_key in by_model.items()
+    ))
+    return sum(counts)
 
-if __name__ == "__main__":
+async def main():
     print("Weather Assistant Demo")
     print("Ensure your OPENAI_API_KEY environment variable is set.")
     print("Type your query (or 'quit' to exit):")
+    await warm_up_open_meteo()
     
     while True:
         user_input = input("\nYou: ")
@@ -219,5 +634,12 @@ if __name__ == "__main__":
         if not user_input:
             continue
             
-        assistant_reply = openai_chat(user_input)
+        assistant_reply = await openai_chat(user_input)
         print(f"Assistant: {assistant_reply}")
+
+    if semantic_cache is not None:
+        semantic_cache.save()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())